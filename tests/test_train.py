@@ -0,0 +1,517 @@
+"""Tests for the Train script, loaded as a module from its path"""
+import importlib.machinery
+import importlib.util
+import json
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+TRAIN_PATH = Path(__file__).resolve().parents[1] / 'Train'
+
+
+@pytest.fixture(scope='module')
+def train():
+    loader = importlib.machinery.SourceFileLoader('train', str(TRAIN_PATH))
+    spec = importlib.util.spec_from_loader('train', loader)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so process-pool workers can unpickle its functions
+    sys.modules['train'] = module
+    loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='module')
+def ledger(train):
+    df, _ = train.generate_synthetic_ledger(2000)
+    return df
+
+
+def test_float32_detection_agrees_with_float64(train, ledger):
+    numeric_cols = ledger.select_dtypes('number').columns
+    agreement = train.precision_agreement(ledger, numeric_cols, contamination=0.05)
+    assert agreement['passed'], agreement
+    assert agreement['max_score_diff'] < 1e-3
+
+
+@pytest.fixture
+def detector(train):
+    backend = train.FakeExcelBackend()
+    return train.ExcelAnomalyDetector('book.xlsx', 'Data', backend=backend), backend
+
+
+def _results(flags):
+    flags = pd.Series(flags, dtype='int8')
+    return pd.DataFrame({
+        'anomaly_flag': flags,
+        'anomaly_score': [-0.6 if flag == -1 else 0.1 for flag in flags],
+        'risk_level': ['HIGH' if flag == -1 else 'NORMAL' for flag in flags],
+    })
+
+
+def test_sparse_write_back_writes_one_block_per_flagged_run(train, detector):
+    detector, backend = detector
+    # Three runs of flagged rows: [1, 2], [5] and [7, 8, 9]
+    results = _results([1, -1, -1, 1, 1, -1, 1, -1, -1, -1, 1])
+    detector.highlight_anomalies_in_excel(results, mode='sparse')
+    assert backend.calls['clear'] == 1
+    assert backend.calls['write'] == 1 + 3
+    assert 'read' not in backend.calls
+
+
+def test_diff_write_back_of_unchanged_results_makes_no_calls(train, detector):
+    detector, backend = detector
+    results = _results([1, -1, 1, 1, -1, -1])
+    detector.highlight_anomalies_in_excel(results, mode='full')
+    backend.reset_counters()
+    detector.highlight_anomalies_in_excel(results, mode='diff')
+    assert backend.round_trips == 0
+
+
+def test_benchmark_excel_round_trips_counts_every_path(train, ledger):
+    profile = train.benchmark_excel_round_trips(ledger.head(500), contamination=0.05)
+    assert profile['excel_read']['round_trips'] == {'read': 1}
+    assert profile['write_back_sparse']['round_trips']['clear'] == 1
+    assert profile['write_back_diff']['round_trips'] == {}
+    # Full mode writes three headers, then three cells per row
+    assert profile['write_back_full']['round_trips']['write'] == 3 + 3 * 500
+
+
+def test_compare_benchmarks_ignores_sub_floor_noise(train):
+    def report(read_seconds, fit_seconds):
+        stages = {'excel_read': {'wall_seconds': read_seconds}, 'fit': {'wall_seconds': fit_seconds}}
+        return {'results': [{'kind': 'expense', 'rows': 1000, 'stages': stages}]}
+
+    regressions = train.compare_benchmarks(report(0.0004, 1.0), report(0.0009, 1.5))
+    assert [r['stage'] for r in regressions] == ['fit']
+
+
+@pytest.mark.parametrize('precision', ['float64', 'float32'])
+def test_range_and_chunk_readers_cast_alike(train, precision):
+    data = [['amount', 'count', 'vendor'], [10.5, 3, 'a'], [7.25, 4, 'b']]
+    from_range, _ = train._frame_from_values(data, precision)
+    from_chunk, _ = train._typed_chunk(pd.DataFrame(data[1:], columns=data[0]), precision, 0)
+    assert dict(from_range.dtypes) == dict(from_chunk.dtypes)
+    assert from_chunk['count'].dtype == precision
+
+
+def test_stale_matrix_cleanup_only_removes_dead_owners_in_this_namespace(train, tmp_path):
+    finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+    finished.wait()
+    namespace = train._pid_namespace()
+    prefix = train.SHARED_MATRIX_PREFIX
+    dead = tmp_path / f'{prefix}_{finished.pid}_{namespace}_aaaa.npy'
+    foreign = tmp_path / f'{prefix}_{finished.pid}_{namespace + 1}_bbbb.npy'
+    own = tmp_path / f'{prefix}_{train.os.getpid()}_{namespace}_cccc.npy'
+    for path in (dead, foreign, own):
+        path.write_bytes(b'')
+    train.cleanup_stale_shared_matrices(str(tmp_path))
+    assert not dead.exists()
+    assert foreign.exists() and own.exists()
+
+
+def test_shared_matrix_round_trip_leaves_nothing_behind(train, tmp_path):
+    features = np.arange(12, dtype=np.float64).reshape(4, 3)
+    with train.SharedFeatureMatrix(features, backing='mmap', directory=str(tmp_path)) as shared:
+        assert np.array_equal(np.load(shared.handle.name, mmap_mode='r'), features)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_run_batch_saves_and_closes_each_workbook_once(train, ledger):
+    backend = train.FakeExcelBackend()
+    data = ledger.iloc[:300, :8]
+    for workbook in ('a.xlsx', 'b.xlsx'):
+        backend.Book(workbook).sheets['Data'].load_frame(data)
+    jobs = [
+        {'workbook': workbook, 'sheet': 'Data', 'range': 'A1:H301',
+         'params': {'write_back': write_back, 'write_mode': 'sparse'}}
+        for workbook, write_back in [('a.xlsx', True), ('a.xlsx', False), ('b.xlsx', False)]
+    ]
+    report = train.run_batch(jobs, max_workers=2, backend=backend)
+    assert list(report['status']) == ['ok'] * 3
+    # Only a.xlsx was written to, but both are closed
+    assert backend.calls['save'] == 1
+    assert backend.calls['close'] == 2
+
+
+def test_adaptive_fit_reports_on_the_model_not_the_frame(train, ledger):
+    numeric_cols = ledger.select_dtypes('number').columns
+    results, model = train._detect_in_frame(ledger.copy(), numeric_cols, 0.05, compact=True,
+                                            n_estimators='auto', return_model=True)
+    report = model.forest.ensemble_report_
+    assert report['n_estimators'] == model.forest.n_estimators < 300
+    assert results.attrs == {}
+
+
+def test_row_ids_do_not_depend_on_precision(train, ledger):
+    # Amounts in cents, as a ledger holds them
+    as_float64 = ledger.round(2)
+    numeric_cols = as_float64.select_dtypes('number').columns
+    as_float32 = as_float64.astype({column: np.float32 for column in numeric_cols})
+    ids = train.stable_row_ids(as_float64)
+    assert np.array_equal(ids, train.stable_row_ids(as_float32))
+    assert len(np.unique(ids)) == len(ids)
+
+
+@pytest.fixture(scope='module')
+def kpi_features(train):
+    df, _ = train.generate_synthetic_ledger(6000, kind='kpi')
+    train.add_kpi_features(df)
+    features = df.select_dtypes('number').to_numpy(float)
+    return train.FeatureStatistics().update(features).transform(features)
+
+
+def test_cascade_on_a_table_within_fit_rows_is_the_full_ensemble(train, kpi_features):
+    predictions, report = train.cascade_consensus(kpi_features, 0.08)
+    assert np.array_equal(predictions, train.consensus_predictions(kpi_features, 0.08))
+    assert report['estimated_missed_anomalies'] == 0.0
+
+
+def test_cascade_widens_candidates_until_estimated_recall_is_met(train, kpi_features):
+    predictions, report = train.cascade_consensus(kpi_features, 0.08, fit_rows=2000)
+    assert report['estimated_recall'] >= 0.9
+    assert report['rounds'] > 1
+    # Rows outside the scored set are reported normal
+    assert np.count_nonzero(predictions != 1) <= report['evaluated_fraction'] * len(predictions)
+
+
+def test_expense_analysis_times_every_stage(train, ledger, monkeypatch, tmp_path, capsys):
+    backend = train.FakeExcelBackend()
+    backend.Book('expense_data.xlsx').sheets['Transactions'].load_frame(ledger.iloc[:999, :8].round(2))
+    monkeypatch.setattr(train, 'xw', backend)
+    monkeypatch.chdir(tmp_path)
+    stages = []
+    original = train.ExcelAnomalyDetector.generate_anomaly_summary
+
+    def summarize(self, results, **kwargs):
+        summary = original(self, results, **kwargs)
+        stages.extend(stage['name'] for stage in summary['timings']['stages'])
+        return summary
+
+    monkeypatch.setattr(train.ExcelAnomalyDetector, 'generate_anomaly_summary', summarize)
+    train.analyze_expense_anomalies()
+    for name in ('excel_read', 'forest_fit', 'score', 'write_back_full', 'summary'):
+        assert name in stages
+
+
+def _post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'))
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def test_scoring_service_coalesces_concurrent_requests(train, ledger):
+    numeric = ledger.select_dtypes('number')
+    model = train.fit_anomaly_model(numeric, 0.05)
+    expected_scores = train.score_features(model, numeric.iloc[:20])[1]
+    responses = [None] * 20
+    barrier = threading.Barrier(20)
+
+    def client(i):
+        barrier.wait()
+        responses[i] = _post_json(f'{service.url}/score/expense',
+                                  {'records': [numeric.iloc[i].to_dict()]})
+
+    with train.ScoringService({'expense': model}, port=0, max_latency=0.2) as service:
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert service.batcher.batches_scored <= 2
+    for i, (status, body) in enumerate(responses):
+        assert status == 200
+        assert body['anomaly_score'][0] == pytest.approx(float(expected_scores[i]), abs=1e-6)
+
+
+def test_scoring_service_answers_bad_requests_with_json_errors(train, ledger):
+    numeric = ledger.select_dtypes('number')
+    model = train.fit_anomaly_model(numeric, 0.05)
+    with train.ScoringService({'expense': model}, port=0) as service:
+        status, body = _post_json(f'{service.url}/score/missing', {'rows': [[0.0] * 8]})
+        assert status == 404 and 'missing' in body['error']
+        status, body = _post_json(f'{service.url}/score/expense', {'rows': [[0.0, 1.0]]})
+        assert status == 400 and body['error'].startswith('ValueError')
+        with urllib.request.urlopen(f'{service.url}/health') as response:
+            assert json.load(response) == {'status': 'ok', 'models': ['expense']}
+
+
+def test_group_detection_matches_serially_and_pools_small_groups(train, ledger):
+    numeric_cols = list(ledger.select_dtypes('number').columns.drop('transaction_id'))
+    frame = ledger.sample(frac=1, random_state=0)
+    options = dict(group_cols='vendor_id', contamination=0.05, min_group_size=200,
+                   batch_rows=500, compact=True)
+    parallel = train._detect_by_group(frame, numeric_cols, max_workers=2, **options)
+    serial = train._detect_by_group(frame, numeric_cols, max_workers=1, **options)
+    assert parallel.index.equals(frame.index)
+    assert parallel.equals(serial)
+    sizes = frame.groupby('vendor_id')['vendor_id'].transform('size')
+    assert 0 < np.count_nonzero(sizes < 200) < len(frame)
+    assert np.array_equal(parallel['pooled_model'], sizes < 200)
+
+
+def test_reservoir_sample_is_uniform_over_the_stream(train):
+    stream = np.arange(20000, dtype=np.float64).reshape(-1, 1)
+    sampler = train.ReservoirSampler(2000, 1, random_state=0)
+    for start in range(0, len(stream), 700):
+        sampler.add(stream[start:start + 700])
+    sample = sampler.sample[:, 0]
+    assert sampler.seen == len(stream)
+    assert len(np.unique(sample)) == 2000
+    # Every quarter of the stream holds about a quarter of the sample
+    quarters = np.bincount((sample // 5000).astype(int), minlength=4)
+    assert np.all(np.abs(quarters - 500) < 100)
+
+
+def test_streaming_fit_sees_every_row_but_trains_on_the_sample(train, ledger):
+    features = ledger.select_dtypes('number').to_numpy(np.float64)
+    chunks = (features[start:start + 300] for start in range(0, len(features), 300))
+    forest, scaler, seen = train.fit_isolation_forest_from_stream(chunks, 0.05, sample_size=512)
+    assert seen == len(features)
+    assert np.allclose(scaler.mean, features.mean(axis=0))
+    assert forest.max_samples_ == 256
+
+
+def test_feature_statistics_accumulate_across_chunks_and_runs(train, ledger, tmp_path):
+    numeric = ledger.select_dtypes('number')
+    stats = train.FeatureStatistics()
+    for start in range(0, len(numeric), 333):
+        stats.update(numeric.iloc[start:start + 333])
+    assert stats.count == len(numeric)
+    assert np.allclose(stats.mean, numeric.mean())
+    assert np.allclose(stats.scale, numeric.std(ddof=0))
+
+    path = tmp_path / 'stats.json'
+    stats.save(str(path))
+    restored = train.FeatureStatistics.load(str(path))
+    assert restored.columns == list(numeric.columns)
+    assert np.array_equal(restored.transform(numeric), stats.transform(numeric))
+    assert [p.name for p in tmp_path.iterdir()] == ['stats.json']
+
+
+def test_compact_results_are_narrow_and_match_the_wide_frame(train, ledger):
+    numeric_cols = ledger.select_dtypes('number').columns
+    wide = train._detect_in_frame(ledger.copy(), numeric_cols, 0.05)
+    compact = train._detect_in_frame(ledger.copy(), numeric_cols, 0.05, compact=True)
+    assert compact.dtypes['anomaly_flag'] == np.int8
+    assert compact.dtypes['anomaly_score'] == np.float32
+    assert list(compact['risk_level'].cat.categories) == list(train.RISK_LEVELS)
+    assert np.array_equal(compact['anomaly_flag'], wide['anomaly_flag'])
+    assert list(compact['risk_level'].astype(str)) == list(wide['risk_level'])
+    assert compact.memory_usage(deep=True).sum() < wide[compact.columns].memory_usage(deep=True).sum() / 3
+
+
+def test_one_model_scores_from_many_threads_without_changing(train, ledger):
+    numeric = ledger.select_dtypes('number')
+    model = train.fit_anomaly_model(numeric, 0.05)
+    reference = train.score_frame(model, numeric)
+    with pytest.raises(ValueError):
+        model.mean[0] = 0.0
+    blocks = [numeric.iloc[i * 200:(i + 1) * 200] for i in range(10)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        scored = list(pool.map(lambda block: train.score_frame(model, block), blocks * 3))
+    assert pd.concat(scored[:10]).equals(reference)
+    assert all(a.equals(b) for a, b in zip(scored[:10], scored[20:]))
+
+
+def test_detector_scoring_api_leaves_the_detector_untouched(train, ledger):
+    backend = train.FakeExcelBackend()
+    detector = train.ExcelAnomalyDetector('book.xlsx', 'Data', backend=backend)
+    detector.ws.load_frame(ledger.iloc[:500, :8])
+    before = dict(vars(detector))
+    model = detector.fit_model('A1:H501', contamination=0.05)
+    results = detector.score_range(model, 'A1:H501')
+    assert vars(detector) == before
+    assert len(results) == 500
+
+
+def test_batch_metrics_cover_every_job_with_stage_timings(train, ledger, tmp_path):
+    backend = train.FakeExcelBackend()
+    backend.Book('book.xlsx').sheets['Data'].load_frame(ledger.iloc[:300, :8])
+    jobs = [
+        {'workbook': 'book.xlsx', 'sheet': 'Data', 'range': 'A1:H301', 'params': {'write_back': write_back}}
+        for write_back in (True, False)
+    ]
+    exporter = train.MetricsExporter(str(tmp_path / 'runs.prom'), str(tmp_path / 'runs.jsonl'),
+                                     labels={'host': 'ci'})
+    report = train.run_batch(jobs, max_workers=1, backend=backend, exporter=exporter)
+    assert report['pipeline_seconds'].notna().all()
+
+    textfile = (tmp_path / 'runs.prom').read_text()
+    assert textfile.count('anomaly_detector_run_duration_seconds{') == 2
+    # Wall, CPU and throughput series for each job's read
+    assert textfile.count('stage="excel_read"') == 6
+    assert '# TYPE anomaly_detector_rows_processed gauge' in textfile
+    records = [json.loads(line) for line in (tmp_path / 'runs.jsonl').read_text().splitlines()]
+    assert [record['labels']['host'] for record in records] == ['ci', 'ci']
+
+
+def test_history_follows_a_row_across_runs_and_sorts(train, ledger, tmp_path):
+    numeric_cols = ledger.select_dtypes('number').columns
+    first = train._detect_in_frame(ledger.copy(), numeric_cols, 0.05, compact=True)
+    shuffled = ledger.sample(frac=1, random_state=1)
+    second = train._detect_in_frame(shuffled.copy(), numeric_cols, 0.05, compact=True)
+    with train.ResultsHistory(str(tmp_path / 'history.db')) as history:
+        first_run = history.record_run(first, ledger, entity_column='vendor_id')
+        second_run = history.record_run(second, shuffled, entity_column='vendor_id')
+        assert list(history.runs()['run_id']) == [second_run, first_run]
+        flagged = history.query(risk_level=['HIGH', 'MEDIUM', 'LOW'], run_id=first_run)
+        assert len(flagged) == int((first['anomaly_flag'] == -1).sum()) > 0
+        assert flagged['anomaly_score'].is_monotonic_increasing
+        row_id = int(flagged['row_id'].iloc[0])
+        assert set(history.query(row_id=row_id)['run_id']) == {first_run, second_run}
+        vendor = flagged['entity'].iloc[0]
+        assert (history.query(entity=vendor)['entity'] == vendor).all()
+
+
+def test_review_index_recognises_reviewed_rows_on_a_rerun(train, ledger, tmp_path):
+    numeric_cols = ledger.select_dtypes('number').columns
+    index = train.ReviewIndex(str(tmp_path / 'reviews.json'))
+    first = index.annotate(train._detect_in_frame(ledger.copy(), numeric_cols, 0.05, compact=True), ledger)
+    flagged = first[first['anomaly_flag'] == -1]
+    index.mark_accepted(flagged.iloc[:3])
+    index.mark_false_positive(flagged.iloc[3:5])
+    index.save()
+
+    reloaded = train.ReviewIndex(str(tmp_path / 'reviews.json'))
+    shuffled = ledger.sample(frac=1, random_state=2)
+    rerun = reloaded.annotate(train._detect_in_frame(shuffled.copy(), numeric_cols, 0.05, compact=True),
+                              shuffled)
+    novelty = rerun['novelty'].loc[flagged.index[:5]]
+    assert list(novelty) == ['previously_seen'] * 3 + ['suppressed'] * 2
+    assert (rerun['novelty'] == 'new').sum() == len(rerun) - 5
+
+    # Write-back only highlights the new anomalies
+    backend = train.FakeExcelBackend()
+    detector = train.ExcelAnomalyDetector('book.xlsx', 'Data', backend=backend)
+    detector.highlight_anomalies_in_excel(rerun, mode='sparse')
+    markers = [value for (row, column), value in detector.ws.values.items() if column == 9 and row > 1]
+    new_anomalies = (rerun['anomaly_flag'] == -1) & (rerun['novelty'] == 'new')
+    assert len(markers) == new_anomalies.sum() < (rerun['anomaly_flag'] == -1).sum()
+
+
+def test_summary_matches_a_groupby_reference(train, ledger):
+    numeric_cols = ledger.select_dtypes('number').columns
+    results = train._detect_in_frame(ledger.copy(), numeric_cols, 0.05, compact=True)
+    summary = train._summarize_results(results, group_by='vendor_id', data=ledger)
+    flagged = results['anomaly_flag'] == -1
+    assert summary['anomalies_detected'] == flagged.sum()
+    assert summary['risk_distribution'] == {
+        level: int(count) for level, count in results['risk_level'].value_counts().items() if count
+    }
+    assert summary['score_percentiles']['p50'] == pytest.approx(
+        results['anomaly_score'].astype(float).median())
+
+    reference = pd.DataFrame({'vendor_id': ledger['vendor_id'], 'flagged': flagged,
+                              'score': results['anomaly_score'].astype(float)}).groupby('vendor_id')
+    groups = {group['vendor_id']: group for group in summary['groups']}
+    for vendor, frame in reference:
+        assert groups[vendor]['rows'] == len(frame)
+        assert groups[vendor]['anomalies'] == frame['flagged'].sum()
+        assert groups[vendor]['min_score'] == pytest.approx(frame['score'].min())
+    anomalies = [group['anomalies'] for group in summary['groups']]
+    assert anomalies == sorted(anomalies, reverse=True)
+
+
+@pytest.mark.parametrize('kind', ['hbos', 'ecod'])
+def test_linear_detectors_find_outliers_and_survive_a_save(train, kind, tmp_path):
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(3000, 4))
+    features[:30] += 8
+    detector = train.LINEAR_DETECTORS[kind](contamination=0.01).fit(features)
+    predictions = detector.predict(features)
+    assert (predictions[:30] == -1).mean() >= 0.9
+    assert (predictions == -1).mean() == pytest.approx(0.01, abs=0.002)
+
+    path = tmp_path / f'{kind}.json'
+    detector.save(str(path))
+    restored = train._LinearDetector.load(str(path))
+    assert type(restored) is type(detector)
+    assert restored.contamination == 0.01
+    assert np.array_equal(restored.score_samples(features), detector.score_samples(features))
+
+
+def test_early_exit_scoring_agrees_with_full_scoring(train):
+    ledger, _ = train.generate_synthetic_ledger(20000)
+    numeric = ledger.select_dtypes('number')
+    model = train.fit_anomaly_model(numeric, 0.01)
+    predictions, scores = train.score_features(model, numeric)
+    early_predictions, early_scores, report = train.score_features_early_exit(model, numeric)
+    assert report['early_exit_rows'] > 0
+    assert report['tree_evaluations'] < report['full_tree_evaluations']
+    assert np.array_equal(early_predictions, predictions)
+    assert np.mean(train._risk_codes(early_scores) == train._risk_codes(scores)) >= 1 - report['delta']
+    # Rows scored on every tree get exactly the full score
+    flagged = predictions == -1
+    assert np.allclose(early_scores[flagged], scores[flagged])
+
+
+def test_node_depths_match_a_walk_of_the_tree(train, ledger):
+    model = train.fit_anomaly_model(ledger.select_dtypes('number'), 0.05, n_estimators=5)
+    for estimator in model.forest.estimators_:
+        tree = estimator.tree_
+        expected = np.zeros(tree.node_count)
+        for node in range(tree.node_count):
+            for child in (tree.children_left[node], tree.children_right[node]):
+                if child >= 0:
+                    expected[child] = expected[node] + 1
+        assert np.array_equal(train._node_depths(tree), expected)
+
+
+def test_out_of_core_detection_keeps_row_order_and_index(train, ledger, tmp_path):
+    frame = ledger.set_index(ledger.index * 10 + 7)
+    chunks = (frame.iloc[start:start + 450] for start in range(0, len(frame), 450))
+    results = train.detect_anomalies_out_of_core(chunks, 0.05, directory=str(tmp_path), chunk_rows=300)
+    compact = results.to_frame()
+    assert compact.index.equals(frame.index)
+    assert results.summary()['anomalies_detected'] == (compact['anomaly_flag'] == -1).sum() > 0
+    assert list(compact['risk_level'].astype(str)) == train._risk_levels(compact['anomaly_score'])
+
+
+def test_risk_levels_follow_the_thresholds(train):
+    scores = np.array([-0.7, -0.5, -0.3, -0.2, -0.01, 0.0, 0.4])
+    assert train._risk_levels(scores) == ['HIGH', 'MEDIUM', 'MEDIUM', 'LOW', 'LOW', 'NORMAL', 'NORMAL']
+
+
+def test_data_sources_must_implement_raw_chunks(train):
+    class Incomplete(train.DataSource):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_csv_source_reads_like_the_excel_path(train, ledger, tmp_path):
+    path = tmp_path / 'ledger.csv'
+    ledger.iloc[:500, :8].to_csv(path, index=False)
+    source = train.open_data_source(str(path))
+    df, numeric_cols = source.load()
+    chunks = list(source.iter_chunks(chunk_rows=128))
+    assert [len(chunk) for chunk, _ in chunks] == [128, 128, 128, 116]
+    assert pd.concat([chunk for chunk, _ in chunks]).equals(df)
+    assert list(numeric_cols) == list(ledger.columns[:8])
+
+
+def test_loading_the_script_imports_no_heavy_modules():
+    script = Path(__file__).resolve().parent.parent / 'Train'
+    probe = (
+        'import importlib.machinery, importlib.util, json, sys\n'
+        'loader = importlib.machinery.SourceFileLoader("train", sys.argv[1])\n'
+        'spec = importlib.util.spec_from_loader("train", loader)\n'
+        'module = importlib.util.module_from_spec(spec)\n'
+        'loader.exec_module(module)\n'
+        'print(json.dumps([name for name in module.HEAVY_MODULES if name in sys.modules]))\n'
+    )
+    output = subprocess.run([sys.executable, '-c', probe, str(script)],
+                            capture_output=True, text=True, check=True).stdout
+    assert json.loads(output) == []